@@ -9,17 +9,24 @@ Supports multipart uploads, dry runs, and progress reporting.
 import argparse
 import logging
 import mimetypes
+import mmap
 import os
+import queue
 import re
+import socket
 import sys
 import threading
 import time
 import urllib.parse
 import requests
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.connection import HTTPConnection
 
 # Configure logging
 logging.basicConfig(
@@ -29,27 +36,222 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# The typical PAR URL path format is:
+# /p/<par_id>/n/<namespace>/b/<bucket>/o/<object_name_prefix>
+_PAR_PATH_RE = re.compile(
+    r'^/p/(?P<par_id>[^/]+)'
+    r'(?:/n/(?P<namespace>[^/]+)/b/(?P<bucket>[^/]+)(?P<object_path>/o(?:/.*)?$)?)?'
+)
+
+# A unit of work for the upload workers: either a whole file sent with a
+# single PUT (part_num is None) or one part of a multipart upload.
+UploadUnit = namedtuple('UploadUnit', ['file_path', 'object_name', 'part_num', 'offset', 'size'])
+
+# Attempts per part upload, and the delay before the first retry in seconds
+PART_UPLOAD_ATTEMPTS = 5
+PART_RETRY_BACKOFF = 0.2
+
+# (connect, read) timeouts in seconds for upload requests, so a stalled
+# connection raises requests.Timeout instead of blocking a worker forever
+UPLOAD_TIMEOUT = (10, 120)
+
+# Units used by OCIUploader._format_size()
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
+
+# Workers batch progress bar updates until at least this many bytes are done
+PROGRESS_UPDATE_BYTES = 32 * 1024 * 1024
+
+
+@lru_cache(maxsize=512)
+def _content_type_for_suffix(suffix):
+    """
+    Look up the content type for a file name suffix.
+    
+    Cached so that trees with many files of the same type only consult the
+    mimetypes database once per suffix.
+    
+    Args:
+        suffix (str): File name suffix including the leading dot, or ''
+        
+    Returns:
+        str: Content type for the suffix
+    """
+    content_type, _ = mimetypes.guess_type('x' + suffix)
+    return content_type or 'application/octet-stream'
+
+
+def _quote_object_path(path):
+    """
+    Percent-encode part of an object name for use in a URL.
+    
+    Equivalent to urllib.parse.quote(path), without the str type dispatch.
+    
+    Args:
+        path (str): Object name or part of one
+        
+    Returns:
+        str: Percent-encoded path
+    """
+    return urllib.parse.quote_from_bytes(path.encode('utf-8'), safe=b'/')
+
+
+@lru_cache(maxsize=1024)
+def _quote_object_directory(directory):
+    """
+    Percent-encode the directory part of an object name, caching the result.
+    
+    Args:
+        directory (str): Object name up to and including the last '/'
+        
+    Returns:
+        str: Percent-encoded directory
+    """
+    return _quote_object_path(directory)
+
+
+class _UploadAdapter(HTTPAdapter):
+    """HTTPAdapter that can pin the socket send buffer size for uploads."""
+
+    def __init__(self, send_buffer=None, **kwargs):
+        """
+        Initialize the adapter.
+        
+        Setting SO_SNDBUF turns off the kernel's send buffer autotuning and is
+        capped by net.core.wmem_max on Linux, so it is only applied when asked
+        for; by default the kernel sizes the buffer itself.
+        
+        Args:
+            send_buffer (int): SO_SNDBUF size in bytes, or None to leave it to the kernel
+            **kwargs: Passed on to HTTPAdapter
+        """
+        # Must be set before HTTPAdapter.__init__, which creates the pool manager
+        self.send_buffer = send_buffer
+        super().__init__(**kwargs)
+    
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager, adding SO_SNDBUF when a send buffer size is set."""
+        if self.send_buffer:
+            # urllib3's defaults already enable TCP_NODELAY; keep them and add the buffer size
+            kwargs.setdefault('socket_options', HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer),
+            ])
+        super().init_poolmanager(*args, **kwargs)
+
+
+class BytesSemaphore:
+    """Semaphore counted in bytes, used to cap the total size of part buffers in flight."""
+
+    def __init__(self, capacity):
+        """
+        Initialize the semaphore.
+        
+        Args:
+            capacity (int): Maximum number of bytes that can be reserved at once
+        """
+        self.capacity = capacity
+        self._available = capacity
+        self._condition = threading.Condition()
+    
+    def acquire(self, n):
+        """
+        Block until n bytes are available and reserve them.
+        
+        Requests larger than the capacity are clamped so they can still run
+        on their own instead of blocking forever.
+        
+        Args:
+            n (int): Number of bytes to reserve
+            
+        Returns:
+            int: Number of bytes actually reserved
+        """
+        n = min(n, self.capacity)
+        with self._condition:
+            while self._available < n:
+                self._condition.wait()
+            self._available -= n
+        return n
+    
+    def release(self, n):
+        """
+        Return previously reserved bytes.
+        
+        Args:
+            n (int): Number of bytes to release, as returned by acquire()
+        """
+        with self._condition:
+            self._available += n
+            self._condition.notify_all()
+    
+    @contextmanager
+    def reserve(self, n):
+        """
+        Context manager that holds n bytes for the duration of the block.
+        
+        Args:
+            n (int): Number of bytes to reserve
+        """
+        reserved = self.acquire(n)
+        try:
+            yield
+        finally:
+            self.release(reserved)
+
 
 class OCIUploader:
     """Class to handle uploading files to OCI using PAR links."""
 
-    def __init__(self, par_url, max_workers=5, chunk_size=10 * 1024 * 1024):
+    def __init__(self, par_url, max_workers=8, chunk_size=10 * 1024 * 1024, part_workers=8,
+                 max_inflight_bytes=512 * 1024 * 1024, progress_bar=None,
+                 target_parts=32, min_chunk=8 * 1024 * 1024, max_chunk=256 * 1024 * 1024,
+                 send_buffer=None):
         """
         Initialize the uploader with PAR URL and configuration settings.
         
         Args:
             par_url (str): Pre-Authenticated Request URL for uploads
-            max_workers (int): Maximum number of concurrent uploads
-            chunk_size (int): Size of chunks for multipart uploads in bytes
+            max_workers (int): Maximum number of concurrent PUT requests across all files
+            chunk_size (int): Files larger than this many bytes use multipart upload
+            part_workers (int): Maximum number of concurrent part uploads per file,
+                and the number of threads used by upload_file()
+            max_inflight_bytes (int): Maximum total size of parts being uploaded at once
+            progress_bar (tqdm): Optional progress bar updated with uploaded bytes
+            target_parts (int): Number of parts to aim for in a multipart upload
+            min_chunk (int): Smallest part size for multipart uploads in bytes
+            max_chunk (int): Largest part size for multipart uploads in bytes
+            send_buffer (int): Socket send buffer size in bytes, or None for kernel autotuning
         """
         self.par_url = par_url
         self.max_workers = max_workers
         self.chunk_size = chunk_size
+        self.part_workers = part_workers
+        self.progress_bar = progress_bar
+        self.target_parts = target_parts
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.send_buffer = send_buffer
+        
+        # Shared by all workers so the combined size of in-flight parts stays bounded
+        self.bytes_semaphore = BytesSemaphore(max_inflight_bytes)
+        
+        # Largest part size at which part_workers parts of one file fit in the
+        # byte budget, rounded down to whole pages like the part sizes themselves
+        self._max_part_size = max_inflight_bytes // part_workers // mmap.PAGESIZE * mmap.PAGESIZE
+        if min_chunk > self._max_part_size:
+            logger.warning(
+                f"Max in-flight bytes ({max_inflight_bytes}) is less than part workers x min chunk "
+                f"({part_workers} x {min_chunk}); fewer than {part_workers} parts of a file can upload at once"
+            )
+        
         self.parsed_url = self._parse_par_url(par_url)
+        self._object_url_prefix = self._get_object_url_prefix()
         
         # Create an OCI Object Storage client configured to use the PAR
         self.client = self._create_client()
         
+        # Share one connection pool across all uploads so TLS/TCP state is reused
+        self.session = self._create_session()
+        
     def _parse_par_url(self, par_url):
         """
         Parse the PAR URL to extract components needed for the API.
@@ -65,22 +267,16 @@ class OCIUploader:
         # Extract endpoint from the hostname
         endpoint = f"{parsed.scheme}://{parsed.netloc}"
         
-        # Extract namespace, bucket and PAR ID from the path
-        path_parts = parsed.path.strip('/').split('/')
-        
-        # The typical PAR URL format is:
-        # https://<endpoint>/p/<par_id>/n/<namespace>/b/<bucket>/o/<object_name_prefix>
-        
         par_info = {
             'endpoint': endpoint,
             'path': parsed.path,
             'query': parsed.query
         }
         
-        # Extract PAR ID if present
-        par_id_index = path_parts.index('p') if 'p' in path_parts else -1
-        if par_id_index != -1 and len(path_parts) > par_id_index + 1:
-            par_info['par_id'] = path_parts[par_id_index + 1]
+        # Extract PAR ID, namespace, bucket and the '/o...' object path when present
+        match = _PAR_PATH_RE.match(parsed.path)
+        if match:
+            par_info.update((key, value) for key, value in match.groupdict().items() if value is not None)
         
         return par_info
         
@@ -96,159 +292,245 @@ class OCIUploader:
         # as PAR URLs are pre-authenticated and don't require the OCI SDK
         return None
     
+    def _create_session(self):
+        """
+        Create an HTTP session whose connection pool is sized for the
+        maximum number of concurrent PUT requests.
+        
+        All uploads go to the single PAR host, so one host pool is enough.
+        It keeps one persistent connection per worker thread, so after the
+        first request every upload, however small, reuses an open TLS
+        connection instead of paying for a new handshake.
+        
+        Returns:
+            requests.Session: Session used for all upload requests
+        """
+        # Directory uploads run max_workers threads, upload_file() runs part_workers
+        pool_size = max(self.max_workers, self.part_workers)
+        adapter = _UploadAdapter(send_buffer=self.send_buffer, pool_connections=1, pool_maxsize=pool_size)
+        
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
     def _get_content_type(self, file_path):
         """
         Determine the content type of a file.
         
         Args:
-            file_path (Path): Path to the file
+            file_path (str or Path): Path to the file
             
         Returns:
             str: Content type of the file
         """
-        content_type, _ = mimetypes.guess_type(str(file_path))
-        return content_type or 'application/octet-stream'
+        name = os.path.basename(file_path)
+        
+        # Everything from the first dot after the start of the name, so that
+        # compound suffixes such as '.tar.gz' keep mapping to their own type
+        dot = name.find('.', 1)
+        return _content_type_for_suffix(name[dot:] if dot != -1 else '')
     
-    def _get_object_name(self, file_path, source_dir, prefix):
+    def _get_object_names(self, file_paths, source_dir, prefix):
         """
-        Determine the object name for a file based on source directory and prefix.
+        Determine the object names for files based on source directory and prefix.
+        
+        All paths are expected to come from scan_directory() on source_dir, so
+        the relative path is a plain string slice rather than Path.relative_to().
         
         Args:
-            file_path (Path): Path to the file
+            file_paths (list): Paths to the files, as strings
             source_dir (Path): Base directory for scanning
-            prefix (str): Prefix to prepend to the object name
+            prefix (str): Prefix to prepend to the object names
             
         Returns:
-            str: Object name for the file in OCI
+            list: Object names for the files in OCI, in the same order
         """
-        # Get the relative path from the source directory
-        rel_path = file_path.relative_to(source_dir)
+        # Length of the source directory including its trailing separator
+        source_len = len(os.path.join(str(source_dir), ''))
         
         # Combine prefix with relative path to get the object name
         prefix = prefix.rstrip('/')
-        object_name = f"{prefix}/{str(rel_path)}" if prefix else str(rel_path)
-        
-        # Normalize object name to use forward slashes
-        object_name = object_name.replace('\\', '/')
+        prefix = f"{prefix}/" if prefix else ''
         
-        return object_name
+        # Normalize object names to use forward slashes
+        return [(prefix + file_path[source_len:]).replace('\\', '/') for file_path in file_paths]
     
-    def upload_file(self, file_path, object_name, dry_run=False):
+    def upload_file(self, file_path, object_name, file_size, dry_run=False):
         """
         Upload a single file to OCI Object Storage using the PAR URL.
         
         Args:
-            file_path (Path): Path to the file to upload
+            file_path (str or Path): Path to the file to upload
             object_name (str): Name of the object in OCI
+            file_size (int): Size of the file in bytes, as already known to the caller
             dry_run (bool): If True, only simulate the upload
             
         Returns:
             bool: True if upload was successful or simulated, False otherwise
         """
-        file_size = file_path.stat().st_size
+        scheduler = UploadScheduler(self, self.part_workers)
+        [(_, _, success)] = scheduler.run([(file_path, object_name, file_size)], dry_run)
+        return success
+    
+    def _plan_units(self, file_path, object_name, file_size):
+        """
+        Split a file into the units of work needed to upload it.
         
+        Args:
+            file_path (str or Path): Path to the file to upload
+            object_name (str): Name of the object in OCI
+            file_size (int): Size of the file in bytes
+            
+        Returns:
+            list: UploadUnit entries, one per PUT request
+        """
         # Determine whether to use multipart upload
-        use_multipart = file_size > self.chunk_size
+        if file_size <= self.chunk_size:
+            return [UploadUnit(file_path, object_name, None, 0, file_size)]
         
-        logger.info(f"{'[DRY RUN] Would upload' if dry_run else 'Uploading'} {file_path} to {object_name} ({self._format_size(file_size)})")
+        part_size = self._get_part_size(file_size)
         
-        if dry_run:
-            # Simulate successful upload for dry runs
-            return True
+        return [
+            UploadUnit(file_path, object_name, part_num, offset, min(part_size, file_size - offset))
+            for part_num, offset in enumerate(range(0, file_size, part_size), start=1)
+        ]
+    
+    def _get_part_size(self, file_size):
+        """
+        Choose the part size for a multipart upload.
         
-        try:
-            if use_multipart:
-                return self._upload_file_multipart(file_path, object_name, file_size)
-            else:
-                return self._upload_file_single(file_path, object_name)
-        except Exception as e:
-            logger.error(f"Error uploading {file_path}: {str(e)}")
-            return False
+        Aims for target_parts parts, so large objects are not split into
+        thousands of requests while smaller ones still have enough parts to
+        upload in parallel, bounded by min_chunk and max_chunk. Parts are also
+        kept small enough that part_workers of them fit in the in-flight byte
+        budget, so the budget does not quietly lower the part concurrency.
+        
+        Args:
+            file_size (int): Size of the file in bytes
+            
+        Returns:
+            int: Part size in bytes, a multiple of the page size
+        """
+        part_size = (file_size + self.target_parts - 1) // self.target_parts
+        part_size = max(self.min_chunk, min(self.max_chunk, self._max_part_size, part_size))
+        
+        # Round up to whole pages so every part starts on a page boundary
+        return -(-part_size // mmap.PAGESIZE) * mmap.PAGESIZE
     
-    def _upload_file_single(self, file_path, object_name):
+    def _upload_unit(self, upload, unit):
         """
-        Upload a file in a single PUT operation.
+        Upload a single unit of work.
         
         Args:
-            file_path (Path): Path to the file to upload
-            object_name (str): Name of the object in OCI
+            upload (_FileUpload): State of the file the unit belongs to
+            unit (UploadUnit): Unit to upload
             
         Returns:
             bool: True if upload was successful, False otherwise
         """
+        if unit.part_num is None:
+            return self._upload_file_single(unit.file_path, upload.upload_url, unit.size)
+        
         try:
-            # Formulate the upload URL by appending the object name to the PAR URL
-            upload_url = self._get_upload_url(object_name)
-            
-            content_type = self._get_content_type(file_path)
-            
-            # Create a PUT request to the upload URL
+            part_url = upload.part_url_prefix + str(unit.part_num)
             headers = {
-                'Content-Type': content_type
+                'Content-Type': 'application/octet-stream'
             }
             
-            with open(file_path, 'rb') as f:
-                response = requests.put(upload_url, data=f, headers=headers)
+            view = upload.open()
             
-            return response.status_code == 200
+            try:
+                with self.bytes_semaphore.reserve(unit.size):
+                    # Start readahead only once the part fits in the byte budget
+                    upload.will_need(unit.offset, unit.size)
+                    response = self._upload_part(view, part_url, unit.offset, unit.size, headers)
+            finally:
+                upload.dont_need(unit.offset, unit.size)
+            
+            if response.status_code != 200:
+                logger.error(f"Error uploading part {unit.part_num} for {unit.file_path}: {response.text}")
+                return False
+            
+            return True
         except Exception as e:
-            logger.error(f"Error in single upload for {file_path}: {str(e)}")
+            logger.error(f"Error in multipart upload for {unit.file_path}: {str(e)}")
             return False
     
-    def _upload_file_multipart(self, file_path, object_name, file_size):
+    def _upload_file_single(self, file_path, upload_url, file_size):
         """
-        Upload a file using multipart upload.
+        Upload a file in a single PUT operation.
         
         Args:
-            file_path (Path): Path to the file to upload
-            object_name (str): Name of the object in OCI
+            file_path (str or Path): Path to the file to upload
+            upload_url (str): Upload URL for the object, from _get_upload_url()
             file_size (int): Size of the file in bytes
             
         Returns:
             bool: True if upload was successful, False otherwise
         """
         try:
-            # For multipart uploads, we need to create a new upload URL for each part
-            upload_url = self._get_upload_url(object_name)
-            
-            # Calculate the number of parts
-            part_count = (file_size + self.chunk_size - 1) // self.chunk_size
+            content_type = self._get_content_type(file_path)
             
-            # Create a progress bar
-            progress_bar = tqdm(total=file_size, unit='B', unit_scale=True, desc=f"Uploading {file_path.name}")
+            # Create a PUT request to the upload URL. An explicit Content-Length
+            # lets the file be streamed in fixed-length mode rather than buffered.
+            headers = {
+                'Content-Type': content_type,
+                'Content-Length': str(file_size)
+            }
             
-            # Read and upload each part
-            with open(file_path, 'rb') as f:
-                for part_num in range(1, part_count + 1):
-                    # Calculate chunk size for current part
-                    current_chunk_size = min(self.chunk_size, file_size - f.tell())
-                    
-                    # Upload the chunk
-                    part_url = f"{upload_url}?partNum={part_num}"
-                    headers = {
-                        'Content-Type': 'application/octet-stream'
-                    }
-                    
-                    # Create a chunk reader to read only the needed amount of data
-                    chunk_data = f.read(current_chunk_size)
-                    
-                    # Upload using requests
-                    response = requests.put(part_url, data=chunk_data, headers=headers)
-                    
-                    # Update progress
-                    progress_bar.update(len(chunk_data))
-                    
-                    if response.status_code != 200:
-                        logger.error(f"Error uploading part {part_num} for {file_path}: {response.text}")
-                        progress_bar.close()
-                        return False
+            if file_size == 0:
+                # requests would add Transfer-Encoding: chunked for an empty file
+                # object, conflicting with the Content-Length set above
+                response = self.session.put(upload_url, data=b'', headers=headers, timeout=UPLOAD_TIMEOUT)
+            else:
+                with open(file_path, 'rb') as f:
+                    response = self.session.put(upload_url, data=f, headers=headers, timeout=UPLOAD_TIMEOUT)
             
-            progress_bar.close()
-            return True
+            return response.status_code == 200
         except Exception as e:
-            logger.error(f"Error in multipart upload for {file_path}: {str(e)}")
+            logger.error(f"Error in single upload for {file_path}: {str(e)}")
             return False
     
+    def _upload_part(self, view, part_url, offset, size, headers):
+        """
+        Upload one part of a memory-mapped file.
+        
+        The part is sent as a slice of the mapping, so pages are read from
+        the page cache straight into the socket without a per-part copy.
+        
+        Transient failures (connection errors, timeouts, throttling and 5xx
+        responses) are retried with exponential backoff, resending the same
+        slice so the file is not read again.
+        
+        Args:
+            view (memoryview): View over the memory-mapped file
+            part_url (str): Upload URL for the part
+            offset (int): Byte offset of the part within the file
+            size (int): Size of the part in bytes
+            headers (dict): Headers to send with the part
+            
+        Returns:
+            requests.Response: Response to the last attempt of the part upload
+        """
+        with view[offset:offset + size] as chunk_data:
+            for attempt in range(1, PART_UPLOAD_ATTEMPTS + 1):
+                try:
+                    response = self.session.put(part_url, data=chunk_data, headers=headers, timeout=UPLOAD_TIMEOUT)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == PART_UPLOAD_ATTEMPTS:
+                        raise
+                    reason = str(e)
+                else:
+                    retryable = response.status_code >= 500 or response.status_code == 429
+                    if not retryable or attempt == PART_UPLOAD_ATTEMPTS:
+                        return response
+                    reason = f"HTTP {response.status_code}"
+                
+                delay = PART_RETRY_BACKOFF * 2 ** (attempt - 1)
+                logger.warning(f"Retrying {part_url} in {delay:.1f}s after attempt {attempt} failed: {reason}")
+                time.sleep(delay)
+    
     def _get_upload_url(self, object_name):
         """
         Create the full upload URL for an object.
@@ -259,19 +541,30 @@ class OCIUploader:
         Returns:
             str: Full URL for uploading the object
         """
-        # Encode the object name
-        encoded_object = urllib.parse.quote(object_name)
+        # Encode the object name. Objects in the same directory share the
+        # quoted directory part, so only the base name is quoted per call.
+        directory, sep, name = object_name.rpartition('/')
+        encoded_object = _quote_object_directory(directory + sep) + _quote_object_path(name)
         
         # Append the object name to the PAR URL
-        # The exact format depends on how the PAR URL is structured
-        if self.parsed_url['path'].endswith('/o/'):
-            # PAR URL already has the object prefix
-            upload_url = f"{self.par_url}{encoded_object}"
-        else:
-            # PAR URL needs the object path added
-            upload_url = f"{self.par_url}/o/{encoded_object}"
+        return f"{self._object_url_prefix}{encoded_object}"
+    
+    def _get_object_url_prefix(self):
+        """
+        Determine what object names are appended to, based on how the PAR URL is structured.
+        
+        Returns:
+            str: PAR URL ending with the '/o/' object path or an object prefix within it
+        """
+        path = self.parsed_url['path']
         
-        return upload_url
+        # Paths the PAR regex does not recognise fall back to a suffix check
+        if 'object_path' in self.parsed_url or path.endswith(('/o', '/o/')):
+            # PAR URL already has the object path, possibly with a prefix such as
+            # '/o/pre/'; object names go straight after it
+            return self.par_url if path.endswith('/') else f"{self.par_url}/"
+        # PAR URL needs the object path added
+        return f"{self.par_url}/o/"
     
     def _format_size(self, size_bytes):
         """
@@ -283,11 +576,280 @@ class OCIUploader:
         Returns:
             str: Formatted size string
         """
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.2f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.2f} PB"
+        # Each unit is 2**10 times the previous one, so the bit length picks the unit
+        index = min(max(0, (size_bytes.bit_length() - 1) // 10), len(SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (index * 10)):.2f} {SIZE_UNITS[index]}"
+
+
+class _FileUpload:
+    """Bookkeeping for one file whose units are spread across the upload workers."""
+
+    def __init__(self, file_path, object_name, file_size, units, upload_url):
+        """
+        Initialize the state for a file upload.
+        
+        Args:
+            file_path (str or Path): Path to the file to upload
+            object_name (str): Name of the object in OCI
+            file_size (int): Size of the file in bytes
+            units (list): UploadUnit entries still to be uploaded
+            upload_url (str): Upload URL for the object
+        """
+        self.file_path = file_path
+        self.object_name = object_name
+        self.file_size = file_size
+        self.upload_url = upload_url
+        # Part URLs only differ by the trailing number, so build the rest once
+        self.part_url_prefix = f"{upload_url}?partNum="
+        self.pending = deque(units)
+        self.in_flight = 0
+        self.failed = False
+        self.started = False
+        self.lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._view = None
+    
+    def mark_started(self):
+        """
+        Record that a unit of this file is starting to upload.
+        
+        Returns:
+            bool: True only for the first unit of the file to start
+        """
+        with self.lock:
+            first, self.started = not self.started, True
+        return first
+    
+    def open(self):
+        """
+        Map the file into memory on first use.
+        
+        The mapping is opened lazily by the first part to start, so files
+        waiting in the queue do not hold file descriptors.
+        
+        Returns:
+            memoryview: View over the memory-mapped file
+        """
+        with self.lock:
+            if self._view is None:
+                self._file = open(self.file_path, 'rb')
+                self._mmap = mmap.mmap(self._file.fileno(), self.file_size, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mmap)
+                
+                # Parts are read front to back, so ask for aggressive readahead
+                self._fadvise(0, self.file_size, 'POSIX_FADV_SEQUENTIAL')
+            return self._view
+    
+    def will_need(self, offset, size):
+        """
+        Start reading a part into the page cache before it is sent.
+        
+        Args:
+            offset (int): Byte offset of the part within the file
+            size (int): Size of the part in bytes
+        """
+        self._fadvise(offset, size, 'POSIX_FADV_WILLNEED')
+    
+    def dont_need(self, offset, size):
+        """
+        Drop a sent part from the mapping and the page cache.
+        
+        This keeps multi-gigabyte uploads from evicting everything else in
+        the page cache. Offsets must be page aligned, as produced by
+        OCIUploader._get_part_size().
+        
+        Args:
+            offset (int): Byte offset of the part within the file
+            size (int): Size of the part in bytes
+        """
+        if hasattr(mmap, 'MADV_DONTNEED'):
+            try:
+                self._mmap.madvise(mmap.MADV_DONTNEED, offset, size)
+            except OSError:
+                pass
+        self._fadvise(offset, size, 'POSIX_FADV_DONTNEED')
+    
+    def _fadvise(self, offset, size, advice):
+        """
+        Give the kernel a best-effort access hint for a byte range of the file.
+        
+        Does nothing on platforms without posix_fadvise (e.g. macOS, Windows).
+        
+        Args:
+            offset (int): Byte offset of the range
+            size (int): Size of the range in bytes
+            advice (str): Name of the os.POSIX_FADV_* constant to apply
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            os.posix_fadvise(self._file.fileno(), offset, size, getattr(os, advice))
+        except OSError:
+            pass
+    
+    def close(self):
+        """Release the mapping once no units are in flight."""
+        if self._view is not None:
+            self._view.release()
+            self._mmap.close()
+            self._file.close()
+            self._view = self._mmap = self._file = None
+
+
+class UploadScheduler:
+    """
+    Upload files through a shared queue of units served by a fixed pool of workers.
+    
+    Every file is split into UploadUnit entries (one per PUT). Workers pull
+    whichever unit is next in the queue, so a large file can use all idle
+    workers while small files are never stuck behind a slow worker.
+    """
+
+    def __init__(self, uploader, num_workers):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            uploader (OCIUploader): Uploader used to perform the PUT requests
+            num_workers (int): Number of worker threads
+        """
+        self.uploader = uploader
+        self.num_workers = num_workers
+        self._queue = queue.Queue()
+        self._results = queue.Queue()
+    
+    def run(self, files, dry_run=False):
+        """
+        Upload a list of files and wait for all of them to finish.
+        
+        Args:
+            files (list): (file_path, object_name, file_size) tuples to upload
+            dry_run (bool): If True, only simulate the uploads
+            
+        Returns:
+            list: (file_path, object_name, success) tuples in completion order
+        """
+        workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.num_workers)]
+        for worker in workers:
+            worker.start()
+        
+        try:
+            for file_path, object_name, file_size in files:
+                try:
+                    self._schedule(file_path, object_name, file_size, dry_run)
+                except Exception as e:
+                    # A file that cannot be planned fails on its own, not the whole run
+                    logger.error(f"Error uploading {file_path}: {str(e)}")
+                    self._results.put((file_path, object_name, False))
+            
+            return [self._results.get() for _ in files]
+        finally:
+            # Stop the workers
+            for _ in workers:
+                self._queue.put(None)
+            for worker in workers:
+                worker.join()
+    
+    def _schedule(self, file_path, object_name, file_size, dry_run):
+        """
+        Split a file into units and queue the first window of them.
+        
+        Args:
+            file_path (str or Path): Path to the file to upload
+            object_name (str): Name of the object in OCI
+            file_size (int): Size of the file in bytes
+            dry_run (bool): If True, only simulate the upload
+        """
+        if dry_run:
+            # Simulate successful upload for dry runs
+            logger.info(f"[DRY RUN] Would upload {file_path} to {object_name} ({self.uploader._format_size(file_size)})")
+            self._results.put((file_path, object_name, True))
+            return
+        
+        units = self.uploader._plan_units(file_path, object_name, file_size)
+        
+        # Formulate the upload URL once per file; every unit of the file reuses it
+        upload_url = self.uploader._get_upload_url(object_name)
+        upload = _FileUpload(file_path, object_name, file_size, units, upload_url)
+        
+        # Cap the parts of one file that are queued at once; the rest are
+        # released one by one as earlier parts complete
+        with upload.lock:
+            for _ in range(min(self.uploader.part_workers, len(units))):
+                self._dispatch(upload)
+    
+    def _dispatch(self, upload):
+        """
+        Queue the next pending unit of a file. Must be called with upload.lock held.
+        
+        Args:
+            upload (_FileUpload): File to take the unit from
+        """
+        unit = upload.pending.popleft()
+        upload.in_flight += 1
+        self._queue.put((upload, unit))
+    
+    def _worker(self):
+        """Worker loop: upload queued units until a stop sentinel is received."""
+        progress_bar = self.uploader.progress_bar
+        
+        # Bytes uploaded by this worker that are not yet shown on the progress bar
+        unreported_bytes = 0
+        
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            
+            upload, unit = item
+            
+            if upload.failed:
+                # Fail fast: units of a failed file already in the queue are skipped
+                self._complete(upload, False)
+                continue
+            
+            # Log when the transfer of a file actually begins, not when it is queued
+            if upload.mark_started():
+                logger.info(f"Uploading {upload.file_path} to {upload.object_name} ({self.uploader._format_size(upload.file_size)})")
+            
+            success = self.uploader._upload_unit(upload, unit)
+            
+            # Update progress in batches to keep tqdm's lock and redraws off the hot path
+            if success:
+                unreported_bytes += unit.size
+            if progress_bar is not None and (unreported_bytes >= PROGRESS_UPDATE_BYTES or self._queue.empty()):
+                progress_bar.update(unreported_bytes)
+                unreported_bytes = 0
+            
+            self._complete(upload, success)
+        
+        if progress_bar is not None and unreported_bytes:
+            progress_bar.update(unreported_bytes)
+    
+    def _complete(self, upload, success):
+        """
+        Record a finished unit and report the file once all its units are done.
+        
+        Args:
+            upload (_FileUpload): File the unit belongs to
+            success (bool): Whether the unit was uploaded successfully
+        """
+        with upload.lock:
+            upload.in_flight -= 1
+            
+            if not success:
+                # Fail fast: drop parts that have not been queued yet
+                upload.failed = True
+                upload.pending.clear()
+            elif upload.pending:
+                self._dispatch(upload)
+            
+            if upload.in_flight:
+                return
+        
+        upload.close()
+        self._results.put((upload.file_path, upload.object_name, not upload.failed))
 
 
 def scan_directory(directory, prefix="", recursive=True):
@@ -300,7 +862,7 @@ def scan_directory(directory, prefix="", recursive=True):
         recursive (bool): Whether to scan subdirectories recursively
         
     Returns:
-        list: List of Path objects for files found
+        list: (path, size) tuples for files found, with paths as strings
     """
     directory = Path(directory).expanduser().resolve()
     
@@ -310,18 +872,45 @@ def scan_directory(directory, prefix="", recursive=True):
     
     files = []
     
-    # Create a glob pattern based on recursion setting
-    pattern = "**/*" if recursive else "*"
-    
-    # Scan for files
-    for file_path in directory.glob(pattern):
-        if file_path.is_file():
-            files.append(file_path)
+    # Walk the tree iteratively with os.scandir: directory entries already
+    # carry the file type, and DirEntry.stat() caches the size we need later
+    stack = [str(directory)]
+    while stack:
+        top = stack.pop()
+        try:
+            with os.scandir(top) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        try:
+                            files.append((entry.path, entry.stat().st_size))
+                        except OSError as e:
+                            # The file vanished or cannot be stat'ed; skip just this one
+                            logger.warning(f"Skipping unreadable file {entry.path}: {str(e)}")
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+        except OSError as e:
+            logger.warning(f"Skipping unreadable directory {top}: {str(e)}")
     
     logger.info(f"Found {len(files)} files in {directory}")
     return files
 
 
+def _positive_int(value):
+    """
+    Argparse type for options that must be a positive integer.
+    
+    Args:
+        value (str): Command line value
+        
+    Returns:
+        int: Parsed value
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
 def main():
     """Main entry point for the script."""
     parser = argparse.ArgumentParser(description="Upload directories to OCI using PAR links")
@@ -331,12 +920,21 @@ def main():
     parser.add_argument("--prefix", default="", help="Prefix to add to object names (e.g., 'data/')")
     parser.add_argument("--dry-run", action="store_true", help="Simulate the upload without actually transferring files")
     parser.add_argument("--no-recursive", action="store_true", help="Do not recursively scan directories")
-    parser.add_argument("--max-workers", type=int, default=5, help="Maximum number of concurrent uploads")
-    parser.add_argument("--chunk-size", type=int, default=10 * 1024 * 1024, help="Chunk size for multipart uploads in bytes")
+    parser.add_argument("--max-workers", type=_positive_int, default=8, help="Maximum number of concurrent uploads across all files")
+    parser.add_argument("--part-workers", type=_positive_int, default=8, help="Maximum number of concurrent part uploads per file")
+    parser.add_argument("--chunk-size", type=_positive_int, default=10 * 1024 * 1024, help="Files larger than this size in bytes use multipart upload")
+    parser.add_argument("--target-parts", type=_positive_int, default=32, help="Number of parts to aim for in a multipart upload")
+    parser.add_argument("--min-chunk", type=_positive_int, default=8 * 1024 * 1024, help="Smallest part size for multipart uploads in bytes")
+    parser.add_argument("--max-chunk", type=_positive_int, default=256 * 1024 * 1024, help="Largest part size for multipart uploads in bytes")
+    parser.add_argument("--max-inflight-bytes", type=_positive_int, default=512 * 1024 * 1024, help="Maximum total size in bytes of parts being uploaded at once")
+    parser.add_argument("--socket-send-buffer", type=_positive_int, help="Socket send buffer size in bytes (default: kernel autotuning)")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
     
     args = parser.parse_args()
     
+    if args.min_chunk > args.max_chunk:
+        parser.error("--min-chunk must not be greater than --max-chunk")
+    
     # Set logging level based on verbosity
     if args.verbose:
         logger.setLevel(logging.DEBUG)
@@ -348,7 +946,13 @@ def main():
     logger.info(f"Dry run: {args.dry_run}")
     logger.info(f"Recursive: {not args.no_recursive}")
     logger.info(f"Max workers: {args.max_workers}")
+    logger.info(f"Part workers: {args.part_workers}")
     logger.info(f"Chunk size: {args.chunk_size} bytes")
+    logger.info(f"Part size: {args.min_chunk}-{args.max_chunk} bytes, targeting {args.target_parts} parts")
+    logger.info(f"Max in-flight bytes: {args.max_inflight_bytes} bytes")
+    
+    # Load the mimetypes database up front rather than on the first upload
+    mimetypes.init()
     
     # Scan the directory for files
     files = scan_directory(args.directory, args.prefix, not args.no_recursive)
@@ -358,43 +962,47 @@ def main():
         return
     
     # Calculate total size
-    total_size = sum(file_path.stat().st_size for file_path in files)
+    total_size = sum(file_size for _, file_size in files)
     logger.info(f"Total upload size: {total_size / (1024 * 1024):.2f} MB")
     
+    # Create a single progress bar shared by all uploads
+    progress_bar = None
+    if not args.dry_run:
+        progress_bar = tqdm(total=total_size, unit='B', unit_scale=True, desc="Uploading", mininterval=0.5)
+    
     # Create an uploader
-    uploader = OCIUploader(args.par_url, args.max_workers, args.chunk_size)
+    uploader = OCIUploader(args.par_url, args.max_workers, args.chunk_size, args.part_workers,
+                           max_inflight_bytes=args.max_inflight_bytes, progress_bar=progress_bar,
+                           target_parts=args.target_parts, min_chunk=args.min_chunk, max_chunk=args.max_chunk,
+                           send_buffer=args.socket_send_buffer)
     
     # Start uploading files
     successful_uploads = 0
     failed_uploads = 0
     start_time = time.time()
     
-    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
-        # Create a list of futures for uploading each file
-        futures = []
-        source_dir = Path(args.directory).expanduser().resolve()
-        
-        for file_path in files:
-            # Determine the object name
-            object_name = uploader._get_object_name(file_path, source_dir, args.prefix)
-            
-            # Schedule the upload
-            future = executor.submit(uploader.upload_file, file_path, object_name, args.dry_run)
-            futures.append((future, file_path, object_name))
-        
-        # Process the results as they complete
-        for future, file_path, object_name in futures:
-            try:
-                result = future.result()
-                if result:
-                    successful_uploads += 1
-                    logger.debug(f"Successfully uploaded {file_path} to {object_name}")
-                else:
-                    failed_uploads += 1
-                    logger.error(f"Failed to upload {file_path} to {object_name}")
-            except Exception as e:
-                failed_uploads += 1
-                logger.error(f"Exception while uploading {file_path}: {str(e)}")
+    source_dir = Path(args.directory).expanduser().resolve()
+    
+    # Determine the object names for all files in one pass
+    object_names = uploader._get_object_names([file_path for file_path, _ in files], source_dir, args.prefix)
+    uploads = [
+        (file_path, object_name, file_size)
+        for (file_path, file_size), object_name in zip(files, object_names)
+    ]
+    
+    # Upload all files through a shared queue of file and part units
+    scheduler = UploadScheduler(uploader, args.max_workers)
+    
+    for file_path, object_name, result in scheduler.run(uploads, args.dry_run):
+        if result:
+            successful_uploads += 1
+            logger.debug(f"Successfully uploaded {file_path} to {object_name}")
+        else:
+            failed_uploads += 1
+            logger.error(f"Failed to upload {file_path} to {object_name}")
+    
+    if progress_bar is not None:
+        progress_bar.close()
     
     # Calculate elapsed time
     elapsed_time = time.time() - start_time